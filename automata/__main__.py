@@ -1,8 +1,13 @@
-from .tests.test_automata import test_dfa, test_nfa, test_reachable, test_equivalent, test_complete, test_merge_equivalent
+from .tests.test_automata import test_dfa, test_nfa, test_reachable, test_equivalent, test_complete, test_merge_equivalent, test_nfa_empty_transitions, test_dfa_multichar_letters, test_minimized, test_long_words, test_dead_states
 
 test_dfa()
 test_nfa()
 test_reachable()
 test_equivalent()
 test_complete()
-test_merge_equivalent()
\ No newline at end of file
+test_merge_equivalent()
+test_nfa_empty_transitions()
+test_dfa_multichar_letters()
+test_minimized()
+test_long_words()
+test_dead_states()
\ No newline at end of file
@@ -1,16 +1,83 @@
 from abc import ABC, abstractmethod
-from queue import Queue
-from copy import deepcopy
-from .utils.unordered_pairs import unique_unordered_pairs, UnorderedPair
+from collections import deque
+from sys import byteorder
+from .utils.unordered_pairs import unique_unordered_pairs
 
-def _is_word_on_alphabet(word : set, alphabet: set):
-    return word.issubset(alphabet)
+def _iter_bits(mask : int):
+    """
+    Iterate over the indices of the set bits of `mask`, from the lowest one
+    """
+
+    while mask:
+        low_bit = mask & -mask
+        yield low_bit.bit_length() - 1
+        mask ^= low_bit
+
+def _dfa_walk(delta : list, idxs, start : int, finals : list) -> bool:
+    """
+    Run the dense transition table `delta` from state index `start` over letter indices `idxs`.
+    A `None` letter index means the letter is not in the alphabet.
+    """
+
+    s = start
+
+    for c in idxs:
+        if c is None:
+            return False
+
+        s = delta[s][c]
+
+        if s < 0:
+            return False
+
+    return finals[s]
+
+def _dfa_walk_bytes(rows : list, idxs : bytes, start : int, finals : list) -> bool:
+    """
+    Run the byte rows transition table `rows` from state index `start` over letter indices `idxs`.
+    The index 255 stands both for a letter not in the alphabet and for a missing transition.
+    """
+
+    s = start
+
+    for c in idxs:
+        s = rows[s][c]
+
+        if s == 255:
+            return False
+
+    return finals[s]
+
+def _dfa_walk_pairs(pair_rows : list, rows : list, idxs : bytes, start : int, finals : list) -> bool:
+    """
+    Same as `_dfa_walk_bytes` but reads the letters two by two with the rows `pair_rows` indexed by
+    the native 16 bits code of two letter indices. `idxs` must only contain letters of the alphabet.
+    """
+
+    s = start
+    even_length = len(idxs) & ~1
+
+    for c in memoryview(idxs[:even_length]).cast("H"):
+        s = pair_rows[s][c]
+
+        if s == 255:
+            return False
+
+    if even_length < len(idxs):
+        s = rows[s][idxs[-1]]
+
+        if s == 255:
+            return False
+
+    return finals[s]
 
 class State:
     """
     Class which represent an Automaton's State
     """
 
+    __slots__ = ("_id", "_transitions", "_out", "_initial", "_final")
+
     def __init__(self, id : int, initial=False, final=False):
         """
         Create a new `State` of id `id` with given `Transition`'s list `transitions`.
@@ -19,6 +86,7 @@ class State:
 
         self._id = id
         self._transitions = set()
+        self._out = {} # letter -> successor id (DFA) or set of successors ids (NFA), "" for transitions without letters
         self._initial = initial
         self._final = final
 
@@ -27,6 +95,8 @@ class Transition:
     Class which represents a Transition for a Automaton
     """
 
+    __slots__ = ("_to", "_letters")
+
     def __init__(self, letters : set, to : int):
         """
         Creates a new `Transition` with labels `letters` and which ends on state `to` 
@@ -46,7 +116,7 @@ class FAutomaton(ABC):
         Construct a new FA with a given `alphabet`.
         """
 
-        self._alphabet = alphabet
+        self._alphabet = frozenset(alphabet)
         self._states = {}
         self._final_states_ids = set()
         self._completed = False
@@ -68,12 +138,7 @@ class FAutomaton(ABC):
         transitions_to_add = {}
 
         for state in self._states.values():
-            all_transitions = set()
-
-            for transition in state._transitions:
-                all_transitions = all_transitions.union(transition._letters)
-
-            diff_letters = self._alphabet.difference(all_transitions)
+            diff_letters = self._alphabet.difference(state._out.keys())
 
             if len(diff_letters) > 0:
                 not_complete = True
@@ -126,6 +191,7 @@ class DFAutomaton(FAutomaton):
 
         super().__init__(alphabet)
         self._initial_state_id = None
+        self._delta = None
 
     def successor(self, state_id : int, letter : str):
         """
@@ -133,30 +199,119 @@ class DFAutomaton(FAutomaton):
         Else, returns `None`.
         """
 
-        for transition in self._states[state_id]._transitions:
-            if letter in transition._letters:
-                return transition._to
+        return self._states[state_id]._out.get(letter)
+
+    def _rebuild_delta(self):
+        """
+        Build the dense transition table used by `accepts`.
+        States and letters are encoded as contiguous indices and `_delta[state][letter]` is the index
+        of the successor state, or -1 if there is no transition.
+        Transitions to dead states (states from which no final state is reachable) are dropped too,
+        so that `accepts` stops as soon as the word cannot be accepted anymore.
+        """
+
+        self._letter_to_idx = {letter: i for i, letter in enumerate(sorted(self._alphabet))}
+        self._state_to_idx = {state_id: i for i, state_id in enumerate(self._states.keys())}
+        self._finals = [state._final for state in self._states.values()]
+        self._delta = []
+        predecessors = [[] for _ in self._states]
+
+        for i, state in enumerate(self._states.values()):
+            row = [-1] * len(self._letter_to_idx)
+
+            for letter, to_id in state._out.items():
+                to_idx = self._state_to_idx[to_id]
+                row[self._letter_to_idx[letter]] = to_idx
+                predecessors[to_idx].append(i)
+
+            self._delta.append(row)
+
+        # live states are the ones which are co-reachable from a final state
+        live = [False] * len(self._states)
+        live_queue = deque()
+
+        for i, final in enumerate(self._finals):
+            if final:
+                live[i] = True
+                live_queue.append(i)
+
+        while live_queue:
+            for i in predecessors[live_queue.popleft()]:
+                if not live[i]:
+                    live[i] = True
+                    live_queue.append(i)
+
+        for row in self._delta:
+            for letter_idx, to_idx in enumerate(row):
+                if to_idx >= 0 and not live[to_idx]:
+                    row[letter_idx] = -1
+
+        # small automata on single characters letters also get one 256 bytes row per state,
+        # indexed by letters translated to bytes by `str.translate`
+        if len(self._states) < 255 and len(self._alphabet) < 255 and all(isinstance(letter, str) and len(letter) == 1 for letter in self._alphabet):
+            self._translation = dict.fromkeys(range(256), 255)
+            self._translation.update((ord(letter), i) for letter, i in self._letter_to_idx.items())
+            self._rows = [bytes(255 if to_idx < 0 else to_idx for to_idx in row).ljust(256, b"\xff") for row in self._delta]
+        else:
+            self._translation = None
+            self._rows = None
+
+        self._pair_rows = None
+
+    def _build_pair_rows(self):
+        """
+        Build the rows used by `_dfa_walk_pairs` from the bytes rows, i.e. the transition table composed with itself.
+        `_pair_rows[state][code]` is the state reached from `state` by the two letters whose indices are packed in `code`.
+        """
+
+        letters_count = len(self._letter_to_idx)
+        self._pair_rows = []
 
-        return None
+        for row in self._rows:
+            pair_row = bytearray(b"\xff" * (256 * letters_count))
 
+            for i in range(letters_count):
+                if row[i] == 255:
+                    continue
+
+                next_row = self._rows[row[i]]
+
+                for j in range(letters_count):
+                    pair_row[int.from_bytes(bytes((i, j)), byteorder)] = next_row[j]
+
+            self._pair_rows.append(bytes(pair_row))
 
     def accepts(self, word : str):
         """
         Predicate if this automaton accepts or not the word `word`
         """
 
-        current_state_id = self._initial_state_id
-
-        if current_state_id is None:
+        if self._initial_state_id is None:
             return False
 
-        for letter in word:
-            current_state_id = self.successor(current_state_id, letter)
+        if self._delta is None:
+            self._rebuild_delta()
 
-            if current_state_id is None:
+        if self._rows is not None and isinstance(word, str):
+            try:
+                # letters out of latin-1 and not in the alphabet are left untranslated by `str.translate`
+                idxs = word.translate(self._translation).encode("latin-1")
+            except UnicodeEncodeError:
                 return False
 
-        return self._states[current_state_id]._final
+            # long words on small alphabets are read two letters at a time
+            if len(idxs) >= 64 and len(self._letter_to_idx) <= 16:
+                if b"\xff" in idxs:
+                    return False
+
+                if self._pair_rows is None:
+                    self._build_pair_rows()
+
+                return _dfa_walk_pairs(self._pair_rows, self._rows, idxs, self._state_to_idx[self._initial_state_id], self._finals)
+
+            return _dfa_walk_bytes(self._rows, idxs, self._state_to_idx[self._initial_state_id], self._finals)
+
+        return _dfa_walk(self._delta, map(self._letter_to_idx.get, word), self._state_to_idx[self._initial_state_id], self._finals)
 
     def add_state(self, id : int, initial=False, final=False):
         """
@@ -167,6 +322,7 @@ class DFAutomaton(FAutomaton):
 
         if self._states.get(id, None) is None:
             self._states[id] = State(id, initial, final)
+            self._delta = None
 
             if initial:
                 if self._initial_state_id is not None:
@@ -183,10 +339,11 @@ class DFAutomaton(FAutomaton):
         Add a transition from automaton's state with id `from_id` to automaton's state with id `to_id`
         """
 
-        letters_set = set(letters)
+        for letter in letters:
+            if letter not in self._alphabet:
+                raise ValueError("Some letters are not in the automaton's alphabet")
 
-        if not _is_word_on_alphabet(letters_set, self._alphabet):
-            raise ValueError("Some letters are not in the automaton's alphabet")
+        letters_set = set(letters)
 
         from_state = self._states.get(from_id, None)
         to_state = self._states.get(to_id, None)
@@ -197,11 +354,23 @@ class DFAutomaton(FAutomaton):
             raise ValueError(f"State with id {to_id} doesn't exists")
 
         for letter in letters_set:
-            for transition in from_state._transitions:
-                if letter in transition._letters:
-                    raise ValueError(f"Transition {letter} already exists. DFAs cannot have two or more transitions with same letters")
+            if letter in from_state._out:
+                raise ValueError(f"Transition {letter} already exists. DFAs cannot have two or more transitions with same letters")
 
-        from_state._transitions.add(Transition(letters_set, to_id))
+        self._add_transition_unchecked(letters_set, from_id, to_id)
+
+    def _add_transition_unchecked(self, letters : set, from_id : int, to_id : int):
+        """
+        Add a transition labelled by the set `letters` without checking the alphabet, the states or the determinism
+        """
+
+        from_state = self._states[from_id]
+        from_state._transitions.add(Transition(letters, to_id))
+
+        for letter in letters:
+            from_state._out[letter] = to_id
+
+        self._delta = None
 
     def reachable_part(self):
         """
@@ -209,30 +378,33 @@ class DFAutomaton(FAutomaton):
         """
 
         # mark only reachable states (Breadth First Search)
-        state_queue = Queue()
-        state_queue.put(self._initial_state_id)
+        marked = set()
+        state_queue = deque()
 
-        marked = {i: False for i in self._states.keys()}
-        waiting = deepcopy(marked)
+        if self._initial_state_id is not None:
+            marked.add(self._initial_state_id)
+            state_queue.append(self._initial_state_id)
 
-        while state_queue.qsize() > 0:
-            state_id = state_queue.get()
-            marked[state_id] = True
-
-            state = self._states[state_id]
+        while state_queue:
+            state = self._states[state_queue.popleft()]
 
             for transition in state._transitions:
-                if not waiting[transition._to] and not marked[transition._to]:
-                    state_queue.put(transition._to)
-                    waiting[transition._to] = True
+                if transition._to not in marked:
+                    marked.add(transition._to)
+                    state_queue.append(transition._to)
+
+        # build a new DFA with only the marked states (i.e. the reachable ones) and their transitions
+        min_dfa = DFAutomaton(self._alphabet)
+        min_dfa._completed = self._completed
 
-        # copy the DFA and update states according to marked dict (i.e. is the state reachable or no)
-        min_dfa = deepcopy(self)
+        reachable_states = [state for state in self._states.values() if state._id in marked]
 
-        for i, state_marked in marked.items():
-            if not state_marked:
-                min_dfa._states.pop(i)
-                min_dfa._final_states_ids.discard(i)
+        for state in reachable_states:
+            min_dfa.add_state(state._id, state._initial, state._final)
+
+        for state in reachable_states:
+            for transition in state._transitions:
+                min_dfa._add_transition_unchecked(set(transition._letters), state._id, transition._to)
 
         return min_dfa
 
@@ -241,29 +413,75 @@ class DFAutomaton(FAutomaton):
         Returns a `UnorderedPair` set of the equivalent states in the DFA.
         """
 
-        equivalents = set(unique_unordered_pairs(self._states.keys()))
-        not_equivalents = set()
+        # Hopcroft's partition refinement on the indices of the states.
+        # Missing transitions go to an extra non final sink state so that partial DFAs are handled.
+        states_ids = list(self._states.keys())
+        state_to_idx = {state_id: i for i, state_id in enumerate(states_ids)}
+        sink = len(states_ids)
+
+        # predecessors[letter][i] is the list of the states going to state i by letter
+        predecessors = {letter: [[] for _ in range(sink + 1)] for letter in self._alphabet}
+
+        for i, state in enumerate(self._states.values()):
+            out = state._out
+
+            for letter in self._alphabet:
+                to_id = out.get(letter)
+                predecessors[letter][sink if to_id is None else state_to_idx[to_id]].append(i)
+
+        for letter in self._alphabet:
+            predecessors[letter][sink].append(sink)
+
+        finals = {state_to_idx[state_id] for state_id in self._final_states_ids}
+        non_finals = set(range(sink + 1)) - finals
+        blocks = [block for block in (finals, non_finals) if block]
+        block_of = [0] * (sink + 1)
 
-        for p in unique_unordered_pairs(self._states.keys()):
-            q, qp = self._states[p.a], self._states[p.b]
-            if (q._final and not qp._final) or (qp._final and not q._final): # final and not final states cannot be =
-                not_equivalents.add(p)
-                equivalents.remove(p)
+        for block_idx, block in enumerate(blocks):
+            for i in block:
+                block_of[i] = block_idx
 
-        new_neq_states = True
+        # waiting blocks are referred by index, a split block keeps its index for its bigger part
+        waiting = {0} if len(blocks) == 2 else set()
 
-        while new_neq_states:
-            new_neq_states = False
+        while waiting:
+            splitter = list(blocks[waiting.pop()])
 
-            for q in unique_unordered_pairs(self._states.keys()):
-                for letter in self._alphabet:
-                    p = UnorderedPair(self.successor(q.a, letter), self.successor(q.b, letter))
+            for letter in self._alphabet:
+                row = predecessors[letter]
+                touched = {}
+
+                for j in splitter:
+                    for i in row[j]:
+                        touched.setdefault(block_of[i], set()).add(i)
+
+                for block_idx, inside in touched.items():
+                    block = blocks[block_idx]
+
+                    if len(inside) == len(block):
+                        continue
+
+                    if len(inside) <= len(block) - len(inside):
+                        smaller = inside
+                        block -= inside
+                    else:
+                        smaller = block - inside
+                        blocks[block_idx] = inside
+
+                    new_block_idx = len(blocks)
+                    blocks.append(smaller)
+
+                    for i in smaller:
+                        block_of[i] = new_block_idx
+
+                    # if the split block was waiting both parts are now, else only the smaller one is needed
+                    waiting.add(new_block_idx)
 
-                    if p in not_equivalents:
-                        not_equivalents.add(q)
-                        equivalents.remove(q)
-                        new_neq_states = True
+        equivalents = set()
 
+        for block in blocks:
+            block_states_ids = [states_ids[i] for i in sorted(block) if i != sink]
+            equivalents.update(unique_unordered_pairs(block_states_ids))
 
         return equivalents
 
@@ -274,21 +492,31 @@ class DFAutomaton(FAutomaton):
 
         eq = self.equivalent_states()
 
-        # remove equivalent states
+        # each removed state is represented by the smallest state of its equivalence class
+        repr_of = {}
+
         for q, qp in eq:
-            self._states.pop(qp, None)
+            repr_of[qp] = min(repr_of.get(qp, q), q)
 
-        # remove remianing transitions to removed states
-        for state in self._states.values():
-            transition_to_remove = set()
+        # remove equivalent states
+        for state_id in repr_of:
+            self._states.pop(state_id)
 
+        self._final_states_ids.difference_update(repr_of)
+
+        if self._initial_state_id in repr_of:
+            self._initial_state_id = repr_of[self._initial_state_id]
+            self._states[self._initial_state_id]._initial = True
+
+        # redirect remaining transitions to removed states onto their representative
+        for state in self._states.values():
             for transition in state._transitions:
-                if UnorderedPair(state._id, transition._to) in eq:
-                    transition_to_remove.add(transition)
+                transition._to = repr_of.get(transition._to, transition._to)
 
-            for transition in transition_to_remove:
-                state._transitions.remove(transition)
+            for letter, to_id in state._out.items():
+                state._out[letter] = repr_of.get(to_id, to_id)
 
+        self._delta = None
 
     def minimized(self):
         """
@@ -313,6 +541,7 @@ class NFAutomaton(FAutomaton):
     
         super().__init__(alphabet)
         self._initial_states_ids = set()
+        self._move = None
 
     def successors(self, states_ids : set, letter : str) -> set:
         """
@@ -321,50 +550,120 @@ class NFAutomaton(FAutomaton):
 
         reachables_states_ids = set()
 
+        if letter not in self._alphabet:
+            return reachables_states_ids
+
         for state_id in states_ids:
-            for transition in self._states[state_id]._transitions:
-                if transition._letters == "" or (letter in transition._letters):
-                    reachables_states_ids.add(transition._to)
+            out = self._states[state_id]._out
+            reachables_states_ids.update(out.get(letter, ()))
+            reachables_states_ids.update(out.get("", ()))
 
         return reachables_states_ids
 
+    def _rebuild_move(self):
+        """
+        Build the bitmask tables used by `accepts`.
+        Each state is given a bit and `_move[letter][bit]` is the bitmask of the successors of this state by `letter`.
+        Transitions without letters are followed whatever the letter of the alphabet is.
+        """
+
+        self._state_to_bit = {state_id: i for i, state_id in enumerate(self._states.keys())}
+        self._move = {letter: [0] * len(self._states) for letter in self._alphabet}
+
+        for state in self._states.values():
+            bit = self._state_to_bit[state._id]
+
+            for letter, to_ids in state._out.items():
+                to_mask = 0
+
+                for to_id in to_ids:
+                    to_mask |= 1 << self._state_to_bit[to_id]
+
+                if letter == "":
+                    for row in self._move.values():
+                        row[bit] |= to_mask
+                else:
+                    self._move[letter][bit] |= to_mask
+
+        self._initial_mask = 0
+        self._final_mask = 0
+
+        for state_id in self._initial_states_ids:
+            self._initial_mask |= 1 << self._state_to_bit[state_id]
+        for state_id in self._final_states_ids:
+            self._final_mask |= 1 << self._state_to_bit[state_id]
+
     def accepts(self, word : str) -> bool:
         """
         Predicate if this automaton accepts or not the word `word`
         """
 
-        reachable_states_ids = self._initial_states_ids
-        
+        if self._move is None:
+            self._rebuild_move()
+
+        move = self._move
+        reachable_mask = self._initial_mask
+
         for letter in word:
-            reachable_states_ids = self.successors(reachable_states_ids, letter)
+            row = move.get(letter)
+
+            if row is None:
+                return False
 
-        return not reachable_states_ids.isdisjoint(self._final_states_ids)
+            current_mask = reachable_mask
+            reachable_mask = 0
+
+            while current_mask:
+                low_bit = current_mask & -current_mask
+                reachable_mask |= row[low_bit.bit_length() - 1]
+                current_mask ^= low_bit
+
+            if not reachable_mask:
+                return False
+
+        return (reachable_mask & self._final_mask) != 0
 
     def determinized(self) -> DFAutomaton:
         """
         Returns a DFA that accepts the same language
         """
 
+        if self._move is None:
+            self._rebuild_move()
+
+        # subsets of states are the bitmasks used by `accepts`, so they are hashed as plain ints
         dfa = DFAutomaton(self._alphabet)
-        dfa.add_state(0, True, not self._final_states_ids.isdisjoint(self._initial_states_ids))
-        new_states = [self._initial_states_ids]
+        dfa.add_state(0, True, (self._initial_mask & self._final_mask) != 0)
+        new_states = {self._initial_mask: 0}
 
-        states_to_treat = Queue()
-        states_to_treat.put(self._initial_states_ids)
+        states_to_treat = deque([self._initial_mask])
 
-        while states_to_treat.qsize() > 0:
-            current_states_ids = states_to_treat.get()
+        while states_to_treat:
+            current_mask = states_to_treat.popleft()
+            current_id = new_states[current_mask]
+            current_bits = list(_iter_bits(current_mask))
+            edges = {}
 
-            for letter in self._alphabet:
-                reachable_states_ids = self.successors(current_states_ids, letter)
+            for letter, row in self._move.items():
+                reachable_mask = 0
 
-                if not reachable_states_ids in new_states:
-                    dfa.add_state(len(new_states), False, not self._final_states_ids.isdisjoint(reachable_states_ids))
+                for i in current_bits:
+                    reachable_mask |= row[i]
 
-                    states_to_treat.put(reachable_states_ids)
-                    new_states.append(reachable_states_ids)
-                
-                dfa.add_transition(letter, new_states.index(current_states_ids), new_states.index(reachable_states_ids))
+                reachable_id = new_states.get(reachable_mask)
+
+                if reachable_id is None:
+                    reachable_id = len(new_states)
+                    new_states[reachable_mask] = reachable_id
+                    dfa.add_state(reachable_id, False, (reachable_mask & self._final_mask) != 0)
+
+                    states_to_treat.append(reachable_mask)
+
+                edges.setdefault(reachable_id, set()).add(letter)
+
+            # one transition per destination, determinization cannot produce conflicting letters
+            for reachable_id, letters in edges.items():
+                dfa._add_transition_unchecked(letters, current_id, reachable_id)
 
         return dfa
 
@@ -377,6 +676,7 @@ class NFAutomaton(FAutomaton):
 
         if self._states.get(id, None) is None:
             self._states[id] = State(id, initial, final)
+            self._move = None
 
             if initial:
                 self._initial_states_ids.add(id)
@@ -390,10 +690,11 @@ class NFAutomaton(FAutomaton):
         Add a transition from automaton's state with id `from_id` to automaton's state with id `to_id`
         """
         
-        letters_set = set(letters)
+        for letter in letters:
+            if letter not in self._alphabet:
+                raise ValueError("Some letters are not in the automaton's alphabet")
 
-        if not _is_word_on_alphabet(letters_set, self._alphabet):
-            raise ValueError("Some letters are not in the automaton's alphabet")
+        letters_set = set(letters)
 
         from_state = self._states.get(from_id, None)
         to_state = self._states.get(to_id, None)
@@ -403,4 +704,9 @@ class NFAutomaton(FAutomaton):
         elif to_state is None:
             raise ValueError(f"State with id {to_id} doesn't exists")
 
-        from_state._transitions.add(Transition(letters_set, to_id))
\ No newline at end of file
+        from_state._transitions.add(Transition(letters_set, to_id))
+
+        for letter in letters_set or ("",):
+            from_state._out.setdefault(letter, set()).add(to_id)
+
+        self._move = None
\ No newline at end of file
@@ -1,4 +1,7 @@
+from random import Random
+from itertools import product
 from ..automata import NFAutomaton, DFAutomaton
+from ..utils.unordered_pairs import UnorderedPair
 
 def test_dfa():
     # counts if has a pair nb of 0
@@ -53,6 +56,22 @@ def test_reachable():
 
     r = b.reachable_part()
 
+    assert set(r._states.keys()) == {0, 1}
+    assert r._initial_state_id == 0
+    assert r._final_states_ids == {0}
+
+    for length in range(7):
+        for letters in product("01", repeat=length):
+            word = "".join(letters)
+            assert r.accepts(word) == b.accepts(word), word
+
+    # without initial state nothing is reachable
+    c = DFAutomaton(set("01"))
+    c.add_state(0, final=True)
+    c.add_transition("01", 0, 0)
+
+    assert len(c.reachable_part()._states) == 0
+
 def test_equivalent():
     # counts if has a pair nb of 0
     b = DFAutomaton(set("01"))
@@ -73,6 +92,55 @@ def test_equivalent():
 
     print(b.equivalent_states())
 
+    assert b.equivalent_states() == {UnorderedPair(1, 2), UnorderedPair(1, 3), UnorderedPair(2, 3)}
+
+    # a missing transition is equivalent to a transition to an explicit dead state
+    c = DFAutomaton(set("ab"))
+
+    c.add_state(0, initial=True, final=True)
+    c.add_state(1)
+    c.add_state(2)
+
+    c.add_transition("a", 0, 1)
+    c.add_transition("b", 0, 2)
+    c.add_transition("ab", 2, 2)
+
+    assert c.equivalent_states() == {UnorderedPair(1, 2)}
+
+    # all final states, complete then partial
+    d = DFAutomaton(set("ab"))
+
+    d.add_state(0, initial=True, final=True)
+    d.add_state(1, final=True)
+
+    d.add_transition("a", 0, 1)
+    d.add_transition("a", 1, 0)
+    d.add_transition("b", 0, 0)
+    d.add_transition("b", 1, 1)
+
+    assert d.equivalent_states() == {UnorderedPair(0, 1)}
+
+    e = DFAutomaton(set("ab"))
+
+    e.add_state(0, initial=True, final=True)
+    e.add_state(1, final=True)
+
+    e.add_transition("a", 0, 1)
+
+    assert e.equivalent_states() == set()
+
+    # no final states
+    f = DFAutomaton(set("ab"))
+
+    f.add_state(0, initial=True)
+    f.add_state(1)
+    f.add_state(2)
+
+    f.add_transition("a", 0, 1)
+    f.add_transition("b", 1, 2)
+
+    assert f.equivalent_states() == {UnorderedPair(0, 1), UnorderedPair(0, 2), UnorderedPair(1, 2)}
+
 def test_complete():
     # accepts (b(a+b))*
     a = DFAutomaton(set("ab"))
@@ -123,4 +191,133 @@ def test_merge_equivalent():
 
     print("remaining states :")
     for s in b._states.keys():
-        print(s)
\ No newline at end of file
+        print(s)
+
+def test_nfa_empty_transitions():
+    # transitions without letters are followed on any letter of the alphabet
+    a = NFAutomaton(set("ab"))
+
+    a.add_state(0, initial=True, final=True)
+    a.add_state(1)
+
+    a.add_transition("", 0, 0)
+    a.add_transition("a", 0, 1)
+
+    da = a.determinized()
+
+    assert a.successors({0}, "b") == {0}
+    assert a.successors({0}, "a") == {0, 1}
+    assert a.successors({0}, "z") == set()
+
+    for word in ["", "a", "ab", "bbab", "z", "az", "€"]:
+        expected = all(letter in "ab" for letter in word)
+        assert a.accepts(word) == expected, word
+        assert da.accepts(word) == expected, word
+
+def test_dfa_multichar_letters():
+    # letters which are not single characters use the list transition table
+    b = DFAutomaton({"ab", "c"})
+
+    b.add_state(0, initial=True, final=True)
+    b.add_transition(["c"], 0, 0)
+
+    assert b.accepts("cc")
+    assert b.accepts(["c", "c"])
+    assert not b.accepts(["c", "ab"])
+
+    # words given as lists of letters are also accepted on single characters alphabets
+    d = DFAutomaton(set("01"))
+
+    d.add_state(0, initial=True)
+    d.add_state(1, final=True)
+    d.add_transition("0", 0, 0)
+    d.add_transition("1", 0, 1)
+
+    assert d.accepts("01")
+    assert d.accepts(["0", "1"])
+    assert not d.accepts(["1", "0"])
+    assert not d.accepts(["0", "1"] * 40)
+
+def test_minimized():
+    # accepts words with an even number of 'a', initial state 2 is merged into state 0
+    b = DFAutomaton(set("ab"))
+
+    b.add_state(0, final=True)
+    b.add_state(1)
+    b.add_state(2, initial=True, final=True)
+
+    b.add_transition("a", 2, 1)
+    b.add_transition("b", 2, 0)
+    b.add_transition("a", 0, 1)
+    b.add_transition("b", 0, 2)
+    b.add_transition("a", 1, 0)
+    b.add_transition("b", 1, 1)
+
+    m = b.minimized()
+
+    assert set(m._states.keys()) == {0, 1}
+    assert m._initial_state_id == 0
+
+    for length in range(7):
+        for letters in product("ab", repeat=length):
+            word = "".join(letters)
+            assert m.accepts(word) == b.accepts(word) == (word.count("a") % 2 == 0), word
+
+def _accepts_by_successor(dfa, word):
+    state_id = dfa._initial_state_id
+
+    for letter in word:
+        state_id = dfa.successor(state_id, letter)
+
+        if state_id is None:
+            return False
+
+    return dfa._states[state_id]._final
+
+def test_long_words():
+    # long words are read two letters at a time, 'b' after 'c' has no transition
+    b = DFAutomaton(set("abc"))
+
+    b.add_state(0, initial=True, final=True)
+    b.add_state(1)
+    b.add_state(2, final=True)
+
+    b.add_transition("a", 0, 1)
+    b.add_transition("bc", 0, 0)
+    b.add_transition("a", 1, 0)
+    b.add_transition("b", 1, 1)
+    b.add_transition("c", 1, 2)
+    b.add_transition("ac", 2, 2)
+
+    rng = Random(0)
+    words = ["ab" * 40, "ab" * 40 + "a", "a" * 100, "a" * 101, "b" * 64 + "ac", "b" * 65 + "acb", "b" * 30 + "acb" + "a" * 60, "a" * 70 + "z"]
+    words += ["".join(rng.choice("abc" if i % 2 else "ab") for _ in range(rng.randint(64, 200))) for i in range(200)]
+
+    for word in words:
+        assert b.accepts(word) == _accepts_by_successor(b, word), word
+
+    assert not b.accepts("b" * 30 + "acb" + "a" * 60)
+
+def test_dead_states():
+    # accepts (b(a+b))*, the PI state added by complete is a sink
+    a = DFAutomaton(set("ab"))
+
+    a.add_state(0, initial=True, final=True)
+    a.add_state(1)
+
+    a.add_transition("b", 0, 1)
+    a.add_transition("ab", 1, 0)
+
+    words = ["", "b", "ba", "bb", "babb", "ab", "bba", "a" + "ba" * 50, "ba" * 50, "ba" * 50 + "b", "ba" * 50 + "a"]
+    expected = [a.accepts(word) for word in words]
+
+    a.complete()
+    pi_id = (set(a._states.keys()) - {0, 1}).pop()
+
+    assert [a.accepts(word) for word in words] == expected
+    assert not a.accepts("a")
+    assert not a.accepts("bbaa" + "b" * 100)
+
+    # transitions to the sink are dropped from the acceptance table
+    pi_idx = a._state_to_idx[pi_id]
+    assert all(pi_idx not in row for row in a._delta)